@@ -1,11 +1,30 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 import fnmatch
+import functools
 import json
 import os
+import re
 import sys
+from collections.abc import Callable, Iterable, Iterator
+from typing import TYPE_CHECKING, Any, cast
+from urllib.parse import quote
+
+if TYPE_CHECKING:
+    import requests
 
-import github
+GITHUB_API_URL = 'https://api.github.com'
+GLOB_CHARS = '*?['
+# The maximum page size GitHub's REST API allows for list endpoints
+PER_PAGE = 100
+# Seconds to wait for GitHub to respond before giving up on a request
+REQUEST_TIMEOUT = 15
+# The number of times to retry failed or rate limited GitHub API requests
+REQUEST_RETRIES = 5
+# The maximum number of commits included in a push event payload
+PUSH_COMMITS_LIMIT = 2048
 
 
 def parse_patterns(patterns_input: str) -> list[str]:
@@ -13,7 +32,8 @@ def parse_patterns(patterns_input: str) -> list[str]:
     if not patterns_input:
         return []
 
-    patterns = [p.strip() for p in patterns_input.split() if p.strip()]
+    # split() with no separator already strips whitespace and drops empty items
+    patterns = patterns_input.split()
 
     if not patterns:
         raise ValueError('No valid patterns found in input')
@@ -21,82 +41,381 @@ def parse_patterns(patterns_input: str) -> list[str]:
     return patterns
 
 
+def _read_event(event_path: str) -> tuple[int | None, str | None, list[str] | None]:
+    """Read the context we need from a GitHub event payload.
+
+    Returns the PR number and head SHA for PR events and the files changed by
+    the pushed commits for push events, with None for anything not found.
+    """
+    with open(event_path, 'rb') as f:
+        event_data = json.load(f)
+
+    pull_request = event_data.get('pull_request')
+    if pull_request is not None:
+        head_sha = pull_request.get('head', {}).get('sha')
+        return pull_request.get('number'), head_sha, None
+
+    # If there are no commits (e.g. for a tag or a deleted branch) or the list
+    # was truncated, the payload can't tell us what changed
+    commits = event_data.get('commits')
+    if not commits or len(commits) >= PUSH_COMMITS_LIMIT:
+        return None, None, None
+
+    # Use a dict rather than a set to keep the files in the order they appear
+    files: dict[str, None] = {}
+    for commit in commits:
+        for key in ('added', 'removed', 'modified'):
+            files.update(dict.fromkeys(commit.get(key, ())))
+
+    return None, None, list(files)
+
+
+def _get_cache_path(repo_name: str, pr_number: int, head_sha: str | None) -> str | None:
+    """Get path of the cached list of changed files for a PR revision."""
+    # Docker actions run with HOME set to /github/home, which the runner mounts
+    # into every container action of a job, so caching there lets multiple
+    # filter steps reuse a single lookup. RUNNER_TEMP, by contrast, is a host
+    # path that isn't mounted into the container
+    home = os.environ.get('HOME')
+    if not home or not head_sha:
+        return None
+
+    cache_dir = os.path.join(home, '.cache', 'file-filter-action')
+    name = f'file-filter-{repo_name.replace("/", "-")}-{pr_number}-{head_sha}.json'
+    return os.path.join(cache_dir, name)
+
+
+def _read_cache(cache_path: str | None) -> list[str] | None:
+    """Read a cached list of changed files, if any."""
+    if not cache_path:
+        return None
+
+    try:
+        with open(cache_path) as f:
+            files: list[str] = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    return files
+
+
+def _write_cache(cache_path: str | None, files: list[str]) -> None:
+    """Write a list of changed files to the cache."""
+    if not cache_path:
+        return
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump(files, f)
+    except OSError as e:
+        print(f'Warning: Could not cache changed files: {e}', file=sys.stderr)
+
+
+def create_session(token: str) -> requests.Session:
+    """Create an authenticated session for the GitHub REST API."""
+    # Third-party modules are imported where they are needed so the early
+    # error paths in main don't pay for loading them
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # GitHub signals secondary rate limits with a 403 and a Retry-After header,
+    # so retry those as well as the usual 429 and 503. This uses type() rather
+    # than a class statement since mypyc doesn't support nested classes
+    github_retry = cast(
+        'type[Retry]',
+        type(
+            'GitHubRetry',
+            (Retry,),
+            {'RETRY_AFTER_STATUS_CODES': Retry.RETRY_AFTER_STATUS_CODES | {403}},
+        ),
+    )
+    retry = github_retry(
+        total=REQUEST_RETRIES,
+        backoff_factor=1,
+        status_forcelist=(500, 502, 503, 504),
+        # Return the final response so raise_for_status reports the real error
+        raise_on_status=False,
+    )
+
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(max_retries=retry))
+    session.mount('http://', HTTPAdapter(max_retries=retry))
+    session.headers.update(
+        {
+            'Accept': 'application/vnd.github+json',
+            'Authorization': f'Bearer {token}',
+            'X-GitHub-Api-Version': '2022-11-28',
+        }
+    )
+    return session
+
+
+def _get_api_url(path: str) -> str:
+    """Get the URL of a GitHub REST API endpoint."""
+    # GITHUB_API_URL is set by the runner and differs on GitHub Enterprise
+    return os.environ.get('GITHUB_API_URL', GITHUB_API_URL).rstrip('/') + path
+
+
+def _iter_pages(session: requests.Session, url: str) -> Iterator[Any]:
+    """Iterate over the items of a paginated GitHub REST API endpoint."""
+    next_url: str | None = url
+    params: dict[str, int] | None = {'per_page': PER_PAGE}
+
+    while next_url:
+        response = session.get(next_url, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        yield from response.json()
+
+        # The next link already includes the query parameters
+        next_url = response.links.get('next', {}).get('url')
+        params = None
+
+
+def _iter_changed_files(
+    session: requests.Session,
+    repo_name: str,
+    base_ref: str | None = None,
+    head_ref: str | None = None,
+) -> Iterator[str]:
+    """Iterate over changed files between base and head refs.
+
+    Errors are raised to the caller, which may already have consumed some files.
+    """
+    # Try to get PR context first
+    event_path = os.environ.get('GITHUB_EVENT_PATH')
+    if event_path:
+        try:
+            pr_number, head_sha, pushed_files = _read_event(event_path)
+
+            if pr_number is not None:
+                cache_path = _get_cache_path(repo_name, pr_number, head_sha)
+
+                cached_files = _read_cache(cache_path)
+                if cached_files is not None:
+                    yield from cached_files
+                    return
+
+                url = _get_api_url(f'/repos/{repo_name}/pulls/{pr_number}/files')
+                changed_files = []
+                for f in _iter_pages(session, url):
+                    changed_files.append(f['filename'])
+                    yield f['filename']
+
+                # We only get here if the caller consumed every file
+                _write_cache(cache_path, changed_files)
+                return
+
+            # Push events list the files changed by each commit, so unless
+            # we were asked to compare specific refs we don't need the API
+            if pushed_files is not None and not (base_ref or head_ref):
+                yield from pushed_files
+                return
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    # Fallback to comparing refs. The runner sets GITHUB_BASE_REF and
+    # GITHUB_HEAD_REF to empty strings outside of PRs, so treat empty values
+    # as unset
+    base_ref = base_ref or os.environ.get('GITHUB_BASE_REF') or 'main'
+    head_ref = (
+        head_ref or os.environ.get('GITHUB_HEAD_REF') or os.environ.get('GITHUB_SHA')
+    )
+
+    if head_ref:
+        # Refs can contain characters such as '#' that are special in URLs
+        basehead = f'{quote(base_ref)}...{quote(head_ref)}'
+        url = _get_api_url(f'/repos/{repo_name}/compare/{basehead}')
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        yield from (f['filename'] for f in response.json().get('files', []))
+        return
+
+    print('Warning: Could not determine changed files', file=sys.stderr)
+
+
+def _report_changed_files_error(exc: Exception) -> None:
+    """Report an error getting changed files."""
+    import requests
+
+    if isinstance(exc, requests.RequestException):
+        print(f'GitHub API error: {exc}', file=sys.stderr)
+    else:
+        print(f'Error getting changed files: {exc}', file=sys.stderr)
+
+
+def iter_changed_files(
+    session: requests.Session,
+    repo_name: str,
+    base_ref: str | None = None,
+    head_ref: str | None = None,
+) -> Iterator[str]:
+    """Iterate over changed files between base and head refs.
+
+    Files are fetched lazily so callers can stop early without requesting the
+    remaining pages. If fetching fails part way, iteration stops early, so this
+    should only be used where a partial list of files is acceptable.
+    """
+    try:
+        yield from _iter_changed_files(session, repo_name, base_ref, head_ref)
+    except Exception as e:
+        _report_changed_files_error(e)
+
+
 def get_changed_files(
-    github_client: github.Github,
+    session: requests.Session,
     repo_name: str,
     base_ref: str | None = None,
     head_ref: str | None = None,
 ) -> list[str]:
     """Get list of changed files between base and head refs."""
     try:
-        repo = github_client.get_repo(repo_name)
-
-        # Try to get PR context first
-        if 'GITHUB_EVENT_PATH' in os.environ:
-            try:
-                with open(os.environ['GITHUB_EVENT_PATH']) as f:
-                    event_data = json.load(f)
-
-                if 'pull_request' in event_data:
-                    pr_number = event_data['pull_request']['number']
-                    pr = repo.get_pull(pr_number)
-                    files = pr.get_files()
-                    return [f.filename for f in files]
-            except (FileNotFoundError, KeyError, json.JSONDecodeError):
-                pass
-
-        # Fallback to comparing refs
-        if not base_ref:
-            base_ref = os.environ.get('GITHUB_BASE_REF', 'main')
-
-        if not head_ref:
-            head_ref = os.environ.get('GITHUB_HEAD_REF', os.environ.get('GITHUB_SHA'))
-
-        if head_ref:
-            comparison = repo.compare(base_ref, head_ref)
-            return [f.filename for f in comparison.files]
-
-        print('Warning: Could not determine changed files', file=sys.stderr)
-        return []
-    except github.GithubException as e:
-        print(f'GitHub API error: {e}', file=sys.stderr)
-        return []
+        return list(_iter_changed_files(session, repo_name, base_ref, head_ref))
     except Exception as e:
-        print(f'Error getting changed files: {e}', file=sys.stderr)
+        _report_changed_files_error(e)
         return []
 
 
-def match_files(files: list[str], patterns: list[str], exclude: bool) -> list[str]:
-    """Match files against glob patterns."""
-    matches = []
+@functools.lru_cache(maxsize=32)
+def _compile_patterns(patterns: tuple[str, ...]) -> re.Pattern[str]:
+    """Compile glob patterns into a single regex matching any of them."""
+    # Translate each pattern once and combine them into a single alternation so
+    # that each file costs one regex match rather than one per pattern
+    return re.compile('|'.join(f'(?:{fnmatch.translate(p)})' for p in patterns))
 
-    for file_path in files:
-        for pattern in patterns:
-            if (fnmatch.fnmatch(file_path, pattern) and not exclude) or exclude:
-                matches.append(file_path)
-                break
 
-    return matches
+def _has_glob_chars(value: str) -> bool:
+    """Check whether a string contains any glob characters."""
+    return any(c in value for c in GLOB_CHARS)
 
 
-def set_output(name: str, value: str) -> None:
-    """Set GitHub Actions output."""
-    if 'GITHUB_OUTPUT' in os.environ:
-        with open(os.environ['GITHUB_OUTPUT'], 'a') as f:
-            f.write(f'{name}={value}\n')
+def _is_suffix_pattern(pattern: str) -> bool:
+    """Check whether a pattern is a '*LITERAL' suffix pattern."""
+    return pattern.startswith('*') and not _has_glob_chars(pattern[1:])
+
+
+def _is_prefix_pattern(pattern: str) -> bool:
+    """Check whether a pattern is a 'LITERAL*' prefix pattern."""
+    return pattern.endswith('*') and not _has_glob_chars(pattern[:-1])
+
+
+def _get_glob_matcher(globs: list[str]) -> Callable[[str], bool]:
+    """Get a function that checks whether a file matches any glob pattern."""
+    # Bind the method once rather than looking it up for every file
+    match = _compile_patterns(tuple(globs)).match
+    return lambda file_path: match(file_path) is not None
+
+
+def _get_matcher(patterns: list[str]) -> Callable[[str], bool]:
+    """Get a function that checks whether a file matches any of the patterns."""
+    literals = set()
+    suffixes = []
+    prefixes = []
+    globs = []
+
+    # Patterns without any glob characters can only ever match themselves,
+    # while '*LITERAL' and 'LITERAL*' patterns are plain suffix and prefix
+    # checks, so save the regex for the patterns that really need it
+    for pattern in patterns:
+        if not _has_glob_chars(pattern):
+            literals.add(pattern)
+        elif _is_suffix_pattern(pattern):
+            suffixes.append(pattern[1:])
+        elif _is_prefix_pattern(pattern):
+            prefixes.append(pattern[:-1])
+        else:
+            globs.append(pattern)
+
+    # Only include the checks we need so that, in the common case of a single
+    # kind of pattern, files are tested without any extra indirection
+    checks: list[Callable[[str], bool]] = []
+    if literals:
+        checks.append(literals.__contains__)
+    if suffixes:
+        suffixes_tuple = tuple(suffixes)
+        checks.append(lambda file_path: file_path.endswith(suffixes_tuple))
+    if prefixes:
+        prefixes_tuple = tuple(prefixes)
+        checks.append(lambda file_path: file_path.startswith(prefixes_tuple))
+    if globs:
+        checks.append(_get_glob_matcher(globs))
+
+    if not checks:
+        return lambda file_path: False
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def is_match(file_path: str) -> bool:
+        for check in checks:
+            if check(file_path):
+                return True
+        return False
+
+    return is_match
+
+
+def match_files(
+    files: Iterable[str], patterns: list[str], exclude: bool = False
+) -> list[str]:
+    """Match files against glob patterns."""
+    # A single glob is the common case and is fastest matched by fnmatch
+    # directly, but literal, prefix and suffix patterns are faster still with
+    # the plain string checks in our matcher
+    if len(patterns) == 1 and not exclude:
+        pattern = patterns[0]
+        if (
+            _has_glob_chars(pattern)
+            and not _is_suffix_pattern(pattern)
+            and not _is_prefix_pattern(pattern)
+        ):
+            return fnmatch.filter(files, pattern)
+
+    is_match = _get_matcher(patterns)
+    return [f for f in files if is_match(f) != exclude]
+
+
+def any_match(files: Iterable[str], patterns: list[str], exclude: bool = False) -> bool:
+    """Check whether any file matches the glob patterns, stopping at the first."""
+    is_match = _get_matcher(patterns)
+    return any(is_match(f) != exclude for f in files)
+
+
+def _dump_files(files: list[str]) -> str:
+    """Serialize a list of files for use as an output value."""
+    if not files:
+        return '[]'
+
+    return json.dumps(files, ensure_ascii=False, separators=(',', ':'))
+
+
+def set_outputs(outputs: dict[str, str]) -> None:
+    """Set multiple GitHub Actions outputs."""
+    output_path = os.environ.get('GITHUB_OUTPUT')
+    if output_path:
+        with open(output_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(f'{name}={value}\n' for name, value in outputs.items()))
     else:
         # Fallback for older runners
-        print(f'::set-output name={name}::{value}')
+        for name, value in outputs.items():
+            print(f'::set-output name={name}::{value}')
+
+
+def set_output(name: str, value: str) -> None:
+    """Set GitHub Actions output."""
+    set_outputs({name: value})
 
 
 def main() -> None:
     """Main function."""
     try:
         patterns_input = os.environ.get('INPUT_PATTERNS', '')
-        token = os.environ.get('INPUT_TOKEN', os.environ.get('GITHUB_TOKEN', ''))
+        token = os.environ.get('INPUT_TOKEN') or os.environ.get('GITHUB_TOKEN', '')
         base_ref = os.environ.get('INPUT_BASE_REF')
         head_ref = os.environ.get('INPUT_HEAD_REF')
         exclude = os.environ.get('INPUT_EXCLUDE')
+        matches_only = os.environ.get('INPUT_MATCHES_ONLY')
         repo_name = os.environ.get('GITHUB_REPOSITORY', '')
 
         if not patterns_input:
@@ -115,19 +434,38 @@ def main() -> None:
             print('Error: exclude must be one of: true, false', file=sys.stderr)
             sys.exit(1)
 
+        if matches_only and matches_only not in ('true', 'false'):
+            print('Error: matches_only must be one of: true, false', file=sys.stderr)
+            sys.exit(1)
+
         patterns = parse_patterns(patterns_input)
         print(f'Parsed patterns: {patterns}')
 
-        github_client = github.Github(token)
-        changed_files = get_changed_files(github_client, repo_name, base_ref, head_ref)
+        session = create_session(token)
+
+        if matches_only == 'true':
+            # We don't need the full list of files so stop at the first match
+            files_iter = iter_changed_files(session, repo_name, base_ref, head_ref)
+            has_matches = any_match(files_iter, patterns, exclude == 'true')
+
+            print(f'Has matches: {has_matches}')
+
+            set_outputs({'matches': 'true' if has_matches else 'false'})
+            sys.exit(0)
+
+        changed_files = get_changed_files(session, repo_name, base_ref, head_ref)
         matched_files = match_files(changed_files, patterns, exclude == 'true')
 
         print(f'Matched files: {matched_files}')
         print(f'Has matches: {bool(matched_files)}')
 
-        set_output('matches', 'true' if matched_files else 'false')
-        set_output('count', str(len(matched_files)))
-        set_output('files', json.dumps(matched_files))
+        set_outputs(
+            {
+                'matches': 'true' if matched_files else 'false',
+                'count': str(len(matched_files)),
+                'files': _dump_files(matched_files),
+            }
+        )
         sys.exit(0)
     except Exception as e:
         print(f'Error: {e}', file=sys.stderr)
@@ -0,0 +1,24 @@
+"""Optionally compile the action with mypyc.
+
+Compilation is opt-in since it requires mypy and a C compiler at build time,
+neither of which are available in the image the action runs in. To build a
+compiled module, install mypy and run::
+
+    FILE_FILTER_USE_MYPYC=1 pip install --no-build-isolation .
+
+The compiled module is only used when the module is imported, e.g. via the
+``file-filter`` script, and the pure Python module is used otherwise.
+"""
+
+import os
+
+from setuptools import Extension, setup
+
+ext_modules: list[Extension] = []
+
+if os.environ.get('FILE_FILTER_USE_MYPYC') == '1':
+    from mypyc.build import mypycify
+
+    ext_modules = mypycify(['file_filter_action.py'])
+
+setup(ext_modules=ext_modules)
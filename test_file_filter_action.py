@@ -1,9 +1,11 @@
+import fnmatch
 import json
 import os
 import tempfile
 from unittest import mock
 
 import pytest
+import requests
 
 import file_filter_action
 
@@ -72,6 +74,143 @@ def test_file_matching_complex_patterns():
     assert 'src/frontend/components/Button.tsx' not in matched_files
 
 
+@pytest.mark.parametrize(
+    'pattern,expected,uses_fnmatch',
+    [
+        ('**/*.py', ['src/main.py'], True),
+        ('src/*.?s', ['src/app.js'], True),
+        ('*.py', ['setup.py', 'src/main.py'], False),
+        ('src/*', ['src/main.py', 'src/app.js'], False),
+        ('setup.py', ['setup.py'], False),
+    ],
+)
+def test_file_matching_single_pattern(pattern, expected, uses_fnmatch):
+    """Test file matching with a single pattern."""
+    files = ['setup.py', 'src/main.py', 'src/app.js']
+
+    with mock.patch('fnmatch.filter', wraps=fnmatch.filter) as mock_filter:
+        matched_files = file_filter_action.match_files(files, [pattern])
+
+    assert matched_files == expected
+    assert mock_filter.called == uses_fnmatch
+
+
+def test_file_matching_single_pattern_exclude():
+    """Test file matching with a single exclude pattern."""
+    files = ['setup.py', 'src/main.py', 'src/app.js']
+
+    with mock.patch('fnmatch.filter', wraps=fnmatch.filter) as mock_filter:
+        matched_files = file_filter_action.match_files(files, ['**/*.py'], exclude=True)
+
+    assert matched_files == ['setup.py', 'src/app.js']
+    mock_filter.assert_not_called()
+
+
+def test_file_matching_literal_patterns():
+    """Test file matching with patterns that contain no glob characters."""
+    files = ['package.json', 'src/package.json', 'requirements.txt', 'setup.py']
+
+    patterns = ['package.json', 'requirements.txt', '*.py']
+    matched_files = file_filter_action.match_files(files, patterns)
+
+    assert matched_files == ['package.json', 'requirements.txt', 'setup.py']
+
+
+def test_file_matching_prefix_and_suffix_patterns():
+    """Test file matching with pure prefix and suffix patterns."""
+    files = ['src/main.py', 'src/app.js', 'docs/index.md', 'setup.cfg']
+
+    patterns = ['*.md', 'src/*']
+    matched_files = file_filter_action.match_files(files, patterns)
+
+    assert matched_files == ['src/main.py', 'src/app.js', 'docs/index.md']
+
+
+def test_file_matching_preserves_order():
+    """Test matched files keep their input order and appear once each."""
+    files = ['b.md', 'a.py', 'docs/c.md', 'lib/d.py', 'e.txt']
+
+    patterns = ['*.py', '*.md', 'lib/*']
+    matched_files = file_filter_action.match_files(files, patterns)
+
+    assert matched_files == ['b.md', 'a.py', 'docs/c.md', 'lib/d.py']
+
+
+def test_file_matching_many_patterns():
+    """Test file matching with many patterns."""
+    files = [
+        'src/backend/api/views.py',
+        'src/backend/api/urls.txt',
+        'src/frontend/components/Button.tsx',
+        'tests/unit/test_api.py',
+        'docs/api/endpoints.md',
+        'Makefile',
+    ]
+
+    patterns = [
+        'src/backend/**/*.py',
+        'src/frontend/components/*.tsx',
+        'src/frontend/*.css',
+        'tests/unit/test_*.py',
+        'tests/functional/test_*.py',
+        'docs/*/[a-d]*.md',
+        'tools/*.sh',
+        'ci/*.y?ml',
+        '*/Makefile',
+    ]
+    matched_files = file_filter_action.match_files(files, patterns)
+
+    assert matched_files == [
+        'src/backend/api/views.py',
+        'src/frontend/components/Button.tsx',
+        'tests/unit/test_api.py',
+    ]
+
+
+def test_file_matching_caches_compiled_patterns():
+    """Test the combined regex is reused across calls with the same patterns."""
+    file_filter_action._compile_patterns.cache_clear()
+
+    file_filter_action.match_files(['src/main.py'], ['*.py', 'docs/**'])
+    file_filter_action.match_files(['docs/README.md'], ['*.py', 'docs/**'])
+
+    info = file_filter_action._compile_patterns.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+
+
+def test_file_matching_exclude():
+    """Test file matching with exclude patterns."""
+    files = [
+        'src/main.py',
+        'docs/README.md',
+        'package.json',
+    ]
+
+    patterns = ['*.py', 'docs/**']
+    matched_files = file_filter_action.match_files(files, patterns, exclude=True)
+
+    assert matched_files == ['package.json']
+
+
+def test_any_match():
+    """Test checking whether any file matches."""
+    files = ['package.json', 'src/main.py', 'docs/README.md']
+
+    assert file_filter_action.any_match(files, ['*.py'])
+    assert not file_filter_action.any_match(files, ['*.js'])
+    assert file_filter_action.any_match(files, ['*.py'], exclude=True)
+    assert not file_filter_action.any_match(files, ['*'], exclude=True)
+
+
+def test_any_match_stops_at_first_match():
+    """Test any_match does not consume files beyond the first match."""
+    files = iter(['src/main.py', 'package.json', 'docs/README.md'])
+
+    assert file_filter_action.any_match(files, ['*.py'])
+    assert list(files) == ['package.json', 'docs/README.md']
+
+
 def test_set_output_with_github_output(tmp_path):
     """Test set_output function with GITHUB_OUTPUT environment variable."""
     output_file = tmp_path / 'github_output'
@@ -85,6 +224,16 @@ def test_set_output_with_github_output(tmp_path):
     assert 'matches=true\n' in content
 
 
+def test_set_outputs_with_github_output(tmp_path):
+    """Test set_outputs function with GITHUB_OUTPUT environment variable."""
+    output_file = tmp_path / 'github_output'
+
+    with mock.patch.dict(os.environ, {'GITHUB_OUTPUT': str(output_file)}):
+        file_filter_action.set_outputs({'matches': 'true', 'count': '2'})
+
+    assert output_file.read_text() == 'matches=true\ncount=2\n'
+
+
 def test_set_output_without_github_output(capsys):
     """Test set_output function without GITHUB_OUTPUT environment variable."""
     # Ensure GITHUB_OUTPUT is not set
@@ -95,20 +244,39 @@ def test_set_output_without_github_output(capsys):
     assert '::set-output name=test_key::test_value' in captured.out
 
 
-@mock.patch('file_filter_action.github.Github')
-def test_get_changed_files_pr_context(mock_github):
+def test_create_session():
+    """Test create_session configures authentication and retries."""
+    session = file_filter_action.create_session('fake_token')
+
+    assert session.headers['Authorization'] == 'Bearer fake_token'
+
+    retry = session.get_adapter('https://api.github.com').max_retries
+    assert retry.total == 5
+    assert retry.is_retry('GET', 502)
+    # secondary rate limits are only retried if GitHub says when to retry
+    assert retry.is_retry('GET', 403, has_retry_after=True)
+    assert not retry.is_retry('GET', 403)
+    assert not retry.is_retry('GET', 404)
+
+
+def _mock_response(data, next_url=None):
+    """Create a mock GitHub REST API response."""
+    response = mock.MagicMock()
+    response.json.return_value = data
+    response.links = {'next': {'url': next_url}} if next_url else {}
+    return response
+
+
+def test_get_changed_files_pr_context():
     """Test get_changed_files with PR context."""
-    # Setup mocks
-    mock_repo = mock.MagicMock()
-    mock_pr = mock.MagicMock()
-    mock_files = [
-        mock.MagicMock(filename='src/main.py'),
-        mock.MagicMock(filename='README.md'),
-        mock.MagicMock(filename='package.json'),
-    ]
-    mock_pr.get_files.return_value = mock_files
-    mock_repo.get_pull.return_value = mock_pr
-    mock_github.return_value.get_repo.return_value = mock_repo
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value = _mock_response(
+        [
+            {'filename': 'src/main.py'},
+            {'filename': 'README.md'},
+            {'filename': 'package.json'},
+        ]
+    )
 
     # Create temporary event file
     event_data = {'pull_request': {'number': 123}}
@@ -117,43 +285,278 @@ def test_get_changed_files_pr_context(mock_github):
         event_file = f.name
 
     try:
-        with mock.patch.dict(os.environ, {'GITHUB_EVENT_PATH': event_file}):
-            github_client = mock_github.return_value
+        with mock.patch.dict(
+            os.environ,
+            {
+                'GITHUB_EVENT_PATH': event_file,
+                'GITHUB_API_URL': 'https://api.github.com',
+            },
+        ):
             changed_files = file_filter_action.get_changed_files(
-                github_client, 'test/repo'
+                mock_session, 'test/repo'
             )
 
         assert changed_files == ['src/main.py', 'README.md', 'package.json']
-        mock_repo.get_pull.assert_called_once_with(123)
+        mock_session.get.assert_called_once_with(
+            'https://api.github.com/repos/test/repo/pulls/123/files',
+            params={'per_page': 100},
+            timeout=15,
+        )
     finally:
         os.unlink(event_file)
 
 
-@mock.patch('file_filter_action.github.Github')
-def test_get_changed_files_ref_comparison(mock_github):
-    """Test get_changed_files with ref comparison fallback."""
-    # Setup mocks
-    mock_repo = mock.MagicMock()
-    mock_comparison = mock.MagicMock()
-    mock_files = [
-        mock.MagicMock(filename='src/main.py'),
-        mock.MagicMock(filename='tests/test_main.py'),
+def test_get_changed_files_pr_context_paginated(tmp_path):
+    """Test get_changed_files follows pagination links."""
+    next_url = 'https://api.github.com/repositories/1/pulls/123/files?page=2'
+    mock_session = mock.MagicMock()
+    mock_session.get.side_effect = [
+        _mock_response([{'filename': 'src/main.py'}], next_url=next_url),
+        _mock_response([{'filename': 'README.md'}]),
     ]
-    mock_comparison.files = mock_files
-    mock_repo.compare.return_value = mock_comparison
-    mock_github.return_value.get_repo.return_value = mock_repo
+
+    event_file = tmp_path / 'event'
+    with event_file.open('w') as f:
+        json.dump({'pull_request': {'number': 123}}, f)
+
+    with mock.patch.dict(os.environ, {'GITHUB_EVENT_PATH': str(event_file)}):
+        changed_files = file_filter_action.get_changed_files(mock_session, 'test/repo')
+
+    assert changed_files == ['src/main.py', 'README.md']
+    assert mock_session.get.call_args_list[1] == mock.call(
+        next_url, params=None, timeout=15
+    )
+
+
+def test_get_changed_files_pr_context_paginated_error(tmp_path, capsys):
+    """Test get_changed_files returns nothing if a later page fails."""
+    next_url = 'https://api.github.com/repositories/1/pulls/123/files?page=2'
+    error_response = _mock_response([])
+    error_response.raise_for_status.side_effect = requests.HTTPError('502 Server Error')
+    mock_session = mock.MagicMock()
+    mock_session.get.side_effect = [
+        _mock_response([{'filename': 'src/main.py'}], next_url=next_url),
+        error_response,
+    ]
+
+    event_file = tmp_path / 'event'
+    with event_file.open('w') as f:
+        json.dump({'pull_request': {'number': 123}}, f)
+
+    with mock.patch.dict(os.environ, {'GITHUB_EVENT_PATH': str(event_file)}):
+        changed_files = file_filter_action.get_changed_files(mock_session, 'test/repo')
+
+    assert changed_files == []
+    assert 'GitHub API error: 502 Server Error' in capsys.readouterr().err
+
+
+def test_get_changed_files_pr_context_cached(tmp_path):
+    """Test get_changed_files reuses cached results for the same PR revision."""
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value = _mock_response(
+        [{'filename': 'src/main.py'}, {'filename': 'README.md'}]
+    )
+
+    event_file = tmp_path / 'event'
+    with event_file.open('w') as f:
+        json.dump({'pull_request': {'number': 123, 'head': {'sha': 'abc123'}}}, f)
+
+    with mock.patch.dict(
+        os.environ,
+        {'GITHUB_EVENT_PATH': str(event_file), 'HOME': str(tmp_path)},
+    ):
+        for _ in range(2):
+            changed_files = file_filter_action.get_changed_files(
+                mock_session, 'test/repo'
+            )
+            assert changed_files == ['src/main.py', 'README.md']
+
+    mock_session.get.assert_called_once()
+    cache_dir = tmp_path / '.cache' / 'file-filter-action'
+    assert [p.name for p in cache_dir.iterdir()] == [
+        'file-filter-test-repo-123-abc123.json'
+    ]
+
+
+def test_get_changed_files_ref_comparison():
+    """Test get_changed_files with ref comparison fallback."""
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value = _mock_response(
+        {'files': [{'filename': 'src/main.py'}, {'filename': 'tests/test_main.py'}]}
+    )
 
     # Test without PR context
     with mock.patch.dict(os.environ, {'GITHUB_SHA': 'abc123'}, clear=True):
-        github_client = mock_github.return_value
-        changed_files = file_filter_action.get_changed_files(github_client, 'test/repo')
+        changed_files = file_filter_action.get_changed_files(mock_session, 'test/repo')
 
     assert changed_files == ['src/main.py', 'tests/test_main.py']
-    mock_repo.compare.assert_called_once_with('main', 'abc123')
+    mock_session.get.assert_called_once_with(
+        'https://api.github.com/repos/test/repo/compare/main...abc123', timeout=15
+    )
+
+
+def test_get_changed_files_ref_comparison_quotes_refs():
+    """Test get_changed_files escapes special characters in refs."""
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value = _mock_response(
+        {'files': [{'filename': 'src/main.py'}]}
+    )
+
+    with mock.patch.dict(os.environ, {}, clear=True):
+        changed_files = file_filter_action.get_changed_files(
+            mock_session, 'test/repo', base_ref='release/1.0', head_ref='fix#123'
+        )
+
+    assert changed_files == ['src/main.py']
+    mock_session.get.assert_called_once_with(
+        'https://api.github.com/repos/test/repo/compare/release/1.0...fix%23123',
+        timeout=15,
+    )
+
+
+def test_get_changed_files_ref_comparison_push_event():
+    """Test get_changed_files ignores the empty refs set outside of PRs."""
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value = _mock_response(
+        {'files': [{'filename': 'src/main.py'}]}
+    )
+
+    with mock.patch.dict(
+        os.environ,
+        {'GITHUB_BASE_REF': '', 'GITHUB_HEAD_REF': '', 'GITHUB_SHA': 'abc123'},
+        clear=True,
+    ):
+        changed_files = file_filter_action.get_changed_files(mock_session, 'test/repo')
+
+    assert changed_files == ['src/main.py']
+    mock_session.get.assert_called_once_with(
+        'https://api.github.com/repos/test/repo/compare/main...abc123', timeout=15
+    )
+
+
+def test_get_changed_files_push_event(tmp_path):
+    """Test get_changed_files uses the files listed in a push event payload."""
+    mock_session = mock.MagicMock()
+
+    event_file = tmp_path / 'event'
+    with event_file.open('w') as f:
+        json.dump(
+            {
+                'commits': [
+                    {'added': ['src/new.py'], 'modified': ['README.md'], 'removed': []},
+                    {'added': [], 'modified': ['src/new.py'], 'removed': ['old.txt']},
+                ],
+            },
+            f,
+        )
+
+    with mock.patch.dict(
+        os.environ,
+        {'GITHUB_EVENT_PATH': str(event_file), 'GITHUB_SHA': 'abc123'},
+        clear=True,
+    ):
+        with mock.patch('json.load', wraps=json.load) as mock_load:
+            changed_files = file_filter_action.get_changed_files(
+                mock_session, 'test/repo'
+            )
+
+    assert changed_files == ['src/new.py', 'README.md', 'old.txt']
+    mock_session.get.assert_not_called()
+    # the payload should only be read once
+    mock_load.assert_called_once()
+
+
+def test_get_changed_files_push_event_explicit_refs(tmp_path):
+    """Test get_changed_files compares refs when asked to for a push event."""
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value = _mock_response(
+        {'files': [{'filename': 'src/main.py'}]}
+    )
+
+    event_file = tmp_path / 'event'
+    with event_file.open('w') as f:
+        json.dump(
+            {'commits': [{'added': ['src/new.py'], 'modified': [], 'removed': []}]}, f
+        )
+
+    with mock.patch.dict(
+        os.environ,
+        {'GITHUB_EVENT_PATH': str(event_file), 'GITHUB_SHA': 'abc123'},
+        clear=True,
+    ):
+        changed_files = file_filter_action.get_changed_files(
+            mock_session, 'test/repo', base_ref='v1.0'
+        )
+
+    assert changed_files == ['src/main.py']
+    mock_session.get.assert_called_once_with(
+        'https://api.github.com/repos/test/repo/compare/v1.0...abc123', timeout=15
+    )
+
+
+def test_get_changed_files_push_event_truncated_commits(tmp_path):
+    """Test get_changed_files compares refs when a push has too many commits."""
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value = _mock_response(
+        {'files': [{'filename': 'src/main.py'}]}
+    )
+
+    # GitHub only includes the first 2048 commits in the payload, so we can't
+    # tell what else changed
+    commit = {'added': ['src/new.py'], 'modified': [], 'removed': []}
+    event_file = tmp_path / 'event'
+    with event_file.open('w') as f:
+        json.dump({'commits': [commit] * file_filter_action.PUSH_COMMITS_LIMIT}, f)
+
+    with mock.patch.dict(
+        os.environ,
+        {'GITHUB_EVENT_PATH': str(event_file), 'GITHUB_SHA': 'abc123'},
+        clear=True,
+    ):
+        changed_files = file_filter_action.get_changed_files(mock_session, 'test/repo')
+
+    assert changed_files == ['src/main.py']
+    mock_session.get.assert_called_once()
+
+
+def test_get_changed_files_push_event_no_commits(tmp_path):
+    """Test get_changed_files compares refs when a push has no commits."""
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value = _mock_response(
+        {'files': [{'filename': 'src/main.py'}]}
+    )
+
+    event_file = tmp_path / 'event'
+    with event_file.open('w') as f:
+        json.dump({'commits': [], 'deleted': True}, f)
+
+    with mock.patch.dict(
+        os.environ,
+        {'GITHUB_EVENT_PATH': str(event_file), 'GITHUB_SHA': 'abc123'},
+        clear=True,
+    ):
+        changed_files = file_filter_action.get_changed_files(mock_session, 'test/repo')
+
+    assert changed_files == ['src/main.py']
+    mock_session.get.assert_called_once()
+
+
+def test_get_changed_files_api_error(capsys):
+    """Test get_changed_files when the GitHub API returns an error."""
+    mock_session = mock.MagicMock()
+    mock_session.get.return_value.raise_for_status.side_effect = requests.HTTPError(
+        '404 Client Error'
+    )
+
+    with mock.patch.dict(os.environ, {'GITHUB_SHA': 'abc123'}, clear=True):
+        changed_files = file_filter_action.get_changed_files(mock_session, 'test/repo')
+
+    assert changed_files == []
+    assert 'GitHub API error: 404 Client Error' in capsys.readouterr().err
 
 
-@mock.patch('file_filter_action.github.Github')
-def test_main_function(mock_github, tmp_path):
+@mock.patch('requests.Session')
+def test_main_function(mock_session, tmp_path):
     """Test main function with mocked GitHub API - integration test."""
     event_file = tmp_path / 'event'
     output_file = tmp_path / 'output'
@@ -162,15 +565,13 @@ def test_main_function(mock_github, tmp_path):
     with event_file.open('w') as f:
         json.dump({'pull_request': {'number': 123}}, f)
 
-    mock_repo = mock.MagicMock()
-    mock_pr = mock.MagicMock()
-    mock_pr.get_files.return_value = [
-        mock.MagicMock(filename='src/main.py'),
-        mock.MagicMock(filename='README.md'),
-        mock.MagicMock(filename='package.json'),
-    ]
-    mock_repo.get_pull.return_value = mock_pr
-    mock_github.return_value.get_repo.return_value = mock_repo
+    mock_session.return_value.get.return_value = _mock_response(
+        [
+            {'filename': 'src/main.py'},
+            {'filename': 'README.md'},
+            {'filename': 'package.json'},
+        ]
+    )
 
     with mock.patch.dict(
         os.environ,
@@ -192,12 +593,11 @@ def test_main_function(mock_github, tmp_path):
         assert 'matches=true' in output_content
         # src/main.py and README.md match *.py and *.md
         assert 'count=2' in output_content
-        assert 'src/main.py' in output_content
-        assert 'README.md' in output_content
+        assert 'files=["src/main.py","README.md"]' in output_content
 
 
-@mock.patch('file_filter_action.github.Github')
-def test_main_function_no_matches(mock_github, tmp_path):
+@mock.patch('requests.Session')
+def test_main_function_no_matches(mock_session, tmp_path):
     """Test main function when no files match patterns."""
     event_file = tmp_path / 'event'
     output_file = tmp_path / 'output'
@@ -206,14 +606,12 @@ def test_main_function_no_matches(mock_github, tmp_path):
     with event_file.open('w') as f:
         json.dump({'pull_request': {'number': 123}}, f)
 
-    mock_repo = mock.MagicMock()
-    mock_pr = mock.MagicMock()
-    mock_pr.get_files.return_value = [
-        mock.MagicMock(filename='package.json'),
-        mock.MagicMock(filename='yarn.lock'),
-    ]
-    mock_repo.get_pull.return_value = mock_pr
-    mock_github.return_value.get_repo.return_value = mock_repo
+    mock_session.return_value.get.return_value = _mock_response(
+        [
+            {'filename': 'package.json'},
+            {'filename': 'yarn.lock'},
+        ]
+    )
 
     with mock.patch.dict(
         os.environ,
@@ -237,6 +635,41 @@ def test_main_function_no_matches(mock_github, tmp_path):
         assert 'files=[]' in output_content
 
 
+@mock.patch('requests.Session')
+def test_main_function_matches_only(mock_session, tmp_path):
+    """Test main function stops at the first match when only matches is needed."""
+    event_file = tmp_path / 'event'
+    output_file = tmp_path / 'output'
+    output_file.touch()
+
+    with event_file.open('w') as f:
+        json.dump({'pull_request': {'number': 123}}, f)
+
+    mock_session.return_value.get.return_value = _mock_response(
+        [
+            {'filename': 'src/main.py'},
+            {'filename': 'README.md'},
+        ]
+    )
+
+    with mock.patch.dict(
+        os.environ,
+        {
+            'INPUT_PATTERNS': '*.py',
+            'INPUT_TOKEN': 'fake_token',
+            'INPUT_MATCHES_ONLY': 'true',
+            'GITHUB_REPOSITORY': 'test/repo',
+            'GITHUB_OUTPUT': str(output_file),
+            'GITHUB_EVENT_PATH': str(event_file),
+        },
+    ):
+        with pytest.raises(SystemExit) as exc_info:
+            file_filter_action.main()
+
+    assert exc_info.value.code == 0
+    assert output_file.read_text() == 'matches=true\n'
+
+
 @pytest.mark.parametrize(
     'missing_env',
     [